@@ -5,7 +5,7 @@ Library for generating XML as a stream without first building a tree in memory.
 Basic usage::
 
     import elementflow
-    file = open('text.xml', 'w') # can be any  object with .write() method
+    file = open('text.xml', 'wb') # can be any  object with .write() method
 
     with elementflow.xml(file, 'root') as xml:
         xml.element('item', attrs={'key': 'value'}, text='text')
@@ -27,30 +27,89 @@ Pretty-printing::
         # ...
 
 """
-import itertools
-import textwrap
-import codecs
-from typing import Callable, Dict, IO, List, Optional, Sequence, Set, Tuple, TypeVar, Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, IO, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
+
+if TYPE_CHECKING:
+    from textwrap import TextWrapper
 
 MapType = TypeVar('MapType')
+AttrsType = Dict[str, Union[str, int]]
+
+BUFFER_SIZE = 65536
+
+# Only short values that need escaping are memoized, so that large texts
+# aren't kept alive by the caches
+_MAX_CACHED_LENGTH = 64
+
+
+def _escape(value: str) -> str:
+    return value.replace('&', '&amp;').replace('<', '&lt;')
+
+
+def _quote_value(value: str) -> str:
+    value = value.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;')
+    return f'"{value}"'
+
+
+_cached_escape = lru_cache(maxsize=4096)(_escape)
+_cached_quote_value = lru_cache(maxsize=4096)(_quote_value)
 
 
 def escape(value: str) -> str:
     if '&' not in value and '<' not in value:
         return value
-    return value.replace('&', '&amp;').replace('<', '&lt;')
+    if len(value) <= _MAX_CACHED_LENGTH:
+        return _cached_escape(value)
+    return _escape(value)
 
 
 def quote_value(value: str) -> str:
-    if '&' in value or '<' in value or '"' in value:
-        value = value.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;')
-    return f'"{value}"'
+    if '&' not in value and '<' not in value and '"' not in value:
+        return f'"{value}"'
+    if len(value) <= _MAX_CACHED_LENGTH:
+        return _cached_quote_value(value)
+    return _quote_value(value)
+
+
+def _format_attr(key: str, value: Union[str, int]) -> str:
+    if isinstance(value, str):
+        return f' {key}={quote_value(value)}'
+    # Integers never contain characters that need escaping
+    if isinstance(value, int) and not isinstance(value, bool):
+        return f' {key}="{value}"'
+    raise TypeError(f'Attribute value must be str or int, not {type(value).__name__}')
+
 
+def _convert_attrs_items(items: Tuple[Tuple[str, Union[str, int]], ...]) -> str:
+    return ''.join(_format_attr(k, v) for k, v in items)
 
-def convert_attrs_to_string(attrs: Optional[Dict[str, str]] = None) -> str:
+
+_cached_convert_attrs_items = lru_cache(maxsize=4096)(_convert_attrs_items)
+
+
+def convert_attrs_to_string(attrs: Optional[AttrsType] = None) -> str:
     if not attrs:
         return ''
-    return ''.join(f' {k}={quote_value(v)}' for k, v in attrs.items())
+    if len(attrs) == 1:
+        (k, v), = attrs.items()
+        return _format_attr(k, v)
+    items = tuple(attrs.items())
+    # Values that compare equal across types (1, 1.0, True) would share a
+    # cache entry, so only string values are cached
+    if all(type(v) is str and len(v) <= _MAX_CACHED_LENGTH for _, v in items):
+        return _cached_convert_attrs_items(items)
+    return _convert_attrs_items(items)
+
+
+@lru_cache(maxsize=1024)
+def _name_parts(name: str) -> Tuple[bytes, bytes, bytes]:
+    """
+    Returns encoded opening, closing and self-closing tags for an element name.
+    The opening tag is left unterminated to allow appending attributes.
+    """
+    name_bytes = name.encode('utf-8')
+    return b'<' + name_bytes, b'</' + name_bytes + b'>', b'<' + name_bytes + b'/>'
 
 
 class XMLGenerator:
@@ -62,15 +121,35 @@ class XMLGenerator:
     - file: an object receiving XML output, anything with .write()
     - root: name of the root element
     - attrs: attributes dict
+    - buffer_size: size of output chunks passed to the file, 64KB by default
+      (0 for a Queue)
 
     Constructor will implicitly open a root container element, you don't need
     to call .container() for it
+
+    Output is accumulated in an internal buffer and passed to the file in
+    chunks of about ``buffer_size`` bytes. The buffer is flushed when the root
+    element is closed, or explicitly with .flush(). A Queue is written to
+    directly by default since it is an in-memory buffer itself.
     """
 
-    def __init__(self, file: IO, root: str, attrs: Optional[Dict[str, str]] = None, **kwargs) -> None:
-        self.file = codecs.getwriter('utf-8')(file)
-        self.file.write('<?xml version="1.0" encoding="utf-8"?>')
-        self.stack: List[str] = []
+    __slots__ = ('file', 'stack', 'buffer_size', '_buffer')
+
+    def __init__(
+            self,
+            file: IO,
+            root: str,
+            attrs: Optional[AttrsType] = None,
+            buffer_size: Optional[int] = None,
+            **kwargs,
+    ) -> None:
+        self.file = file
+        if buffer_size is None:
+            buffer_size = 0 if isinstance(file, Queue) else BUFFER_SIZE
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._write(b'<?xml version="1.0" encoding="utf-8"?>')
+        self.stack: List[bytes] = []
         self.container(root, attrs, **kwargs)
 
     def __enter__(self) -> 'XMLGenerator':
@@ -78,43 +157,80 @@ class XMLGenerator:
 
     def __exit__(self, exc_type, exc_value, exc_tb) -> None:
         if exc_type:
+            self.flush()
             return
-        self.file.write(f'</{self.stack.pop()}>')
+        self._write(self.stack.pop())
+        if not self.stack:
+            self.flush()
+
+    def _write(self, value: bytes) -> None:
+        self._buffer += value
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Passes buffered output to the file. Doesn't flush the file itself.
 
-    def container(self, name: str, attrs: Optional[Dict[str, str]] = None, **kwargs) -> 'XMLGenerator':
+        Output that is still buffered when a generator is discarded without
+        closing the root element or calling .flush() is lost.
+        """
+        if self._buffer:
+            self.file.write(bytes(self._buffer))
+            self._buffer.clear()
+
+    def container(self, name: str, attrs: Optional[AttrsType] = None, **kwargs) -> 'XMLGenerator':
         """
         Opens a new element containing sub-elements and text nodes.
         Intends to be used under ``with`` statement.
         """
-        self.file.write(f'<{name}{convert_attrs_to_string(attrs)}>')
-        self.stack.append(name)
+        open_tag, close_tag, _ = _name_parts(name)
+        if attrs:
+            open_tag += convert_attrs_to_string(attrs).encode('utf-8')
+        self._write(open_tag + b'>')
+        self.stack.append(close_tag)
         return self
 
-    def element(self, name: str, attrs: Optional[Dict[str, str]] = None, text: str = '') -> None:
+    def element(self, name: str, attrs: Optional[AttrsType] = None, text: str = '') -> None:
         """
         Generates a single element, either empty or with a text contents.
         """
+        open_tag, close_tag, empty_tag = _name_parts(name)
+        if attrs:
+            open_tag += convert_attrs_to_string(attrs).encode('utf-8')
         if text:
-            self.file.write(f'<{name}{convert_attrs_to_string(attrs)}>{escape(text)}</{name}>')
+            self._write(open_tag + b'>' + escape(text).encode('utf-8') + close_tag)
+        elif attrs:
+            self._write(open_tag + b'/>')
         else:
-            self.file.write(f'<{name}{convert_attrs_to_string(attrs)}/>')
+            self._write(empty_tag)
 
     def text(self, value: str) -> None:
         """
         Generates a text in currently open container.
         """
-        self.file.write(escape(value))
+        self._write(escape(value).encode('utf-8'))
 
     def comment(self, value: str) -> None:
         """
         Adds a comment to the xml
         """
-        value = value.replace('--', '')
-        self.file.write(f'<!--{value}-->')
+        if '--' in value:
+            value = value.replace('--', '')
+        self._write(b'<!--' + value.encode('utf-8') + b'-->')
+
+    def many(self, name: str, items: Iterable[Tuple[Optional[AttrsType], str]]) -> None:
+        """
+        Generates a sequence of elements with the same name from an iterable
+        of (attrs, text) pairs.
+        """
+        element = self.element
+        for attrs, text in items:
+            element(name, attrs, text=text)
 
     def map(
             self,
-            func: Callable[[MapType], Tuple[str, Optional[Dict[str, str]], str]],
+            func: Callable[[MapType], Tuple[Any, ...]],
             sequence: Sequence[MapType],
     ) -> None:
         """
@@ -122,8 +238,12 @@ class XMLGenerator:
         First parameter is a function that accepts an object from the sequence and
         return a tuple of arguments for "element" method.
         """
+        element = self.element
         for item in sequence:
-            self.element(*func(item))
+            element(*func(item))
+
+
+_NO_PREFIXES: FrozenSet[str] = frozenset()
 
 
 class NamespacedGenerator(XMLGenerator):
@@ -131,38 +251,55 @@ class NamespacedGenerator(XMLGenerator):
     XML generator with support for namespaces.
     """
 
+    __slots__ = ('namespaces',)
+
     def __init__(
             self,
             file: IO,
             root: str,
-            attrs: Optional[Dict[str, str]] = None,
+            attrs: Optional[AttrsType] = None,
             namespaces: Optional[Dict[str, str]] = None,
+            buffer_size: Optional[int] = None,
     ) -> None:
-        self.namespaces: List[Set[str]] = [{'xml'}]
-        super().__init__(file, root, attrs=attrs, namespaces=namespaces)
+        self.namespaces: List[FrozenSet[str]] = [frozenset({'xml'})]
+        super().__init__(file, root, attrs=attrs, buffer_size=buffer_size, namespaces=namespaces)
 
     def _process_namespaces(
             self,
             name: str,
-            attrs: Optional[Dict[str, str]] = None,
+            attrs: Optional[AttrsType] = None,
             namespaces: Optional[Dict[str, str]] = None,
-    ) -> Tuple[Dict[str, str], Set[str]]:
-        prefixes: Set[str] = self.namespaces[-1]
+    ) -> Optional[AttrsType]:
+        if ':' in name:
+            self._check_prefix(name, namespaces)
+        if attrs:
+            for key in attrs:
+                if ':' in key:
+                    self._check_prefix(key, namespaces)
         if namespaces:
-            prefixes |= set(namespaces)
-        attributes = attrs or {}
-        names = [n for n in itertools.chain((name,), attributes) if ':' in n]
-        for name in names:
-            prefix = name.split(':')[0]
-            if prefix not in prefixes:
-                raise ValueError(f'Unknown namespace prefix: {prefix}')
-        if namespaces:
-            namespaces = {
-                f'xmlns:{key}' if key else 'xmlns': value
+            attrs = dict(attrs or {})
+            attrs.update(
+                (f'xmlns:{key}' if key else 'xmlns', value)
                 for key, value in namespaces.items()
-            }
-            attributes.update(namespaces)
-        return attributes, prefixes
+            )
+        return attrs
+
+    def _known(self, prefix: str) -> bool:
+        """
+        Checks if a prefix is declared by any of the currently open containers.
+        Each stack frame only holds prefixes declared at its own level.
+        """
+        for prefixes in reversed(self.namespaces):
+            if prefix in prefixes:
+                return True
+        return False
+
+    def _check_prefix(self, name: str, namespaces: Optional[Dict[str, str]] = None) -> None:
+        prefix = name.partition(':')[0]
+        if namespaces and prefix in namespaces:
+            return
+        if not self._known(prefix):
+            raise ValueError(f'Unknown namespace prefix: {prefix}')
 
     def __exit__(self, exc_type, exc_value, exc_tb) -> None:
         super().__exit__(exc_type, exc_value, exc_tb)
@@ -171,21 +308,22 @@ class NamespacedGenerator(XMLGenerator):
     def container(
             self,
             name: str,
-            attrs: Optional[Dict[str, str]] = None,
+            attrs: Optional[AttrsType] = None,
             namespaces: Optional[Dict[str, str]] = None,
+            **kwargs,
     ) -> XMLGenerator:
-        attrs, prefixes = self._process_namespaces(name, attrs, namespaces)
-        self.namespaces.append(prefixes)
-        return super().container(name, attrs)
+        attrs = self._process_namespaces(name, attrs, namespaces)
+        self.namespaces.append(frozenset(namespaces) if namespaces else _NO_PREFIXES)
+        return super().container(name, attrs, **kwargs)
 
-    def element(
+    def element(  # type: ignore[override]
             self,
             name: str,
-            attrs: Optional[Dict[str, str]] = None,
+            attrs: Optional[AttrsType] = None,
             namespaces: Optional[Dict[str, str]] = None,
             text: str = '',
     ) -> None:
-        attributes, _ = self._process_namespaces(name, attrs, namespaces)
+        attributes = self._process_namespaces(name, attrs, namespaces)
         super().element(name, attributes, text)
 
 
@@ -194,16 +332,31 @@ class IndentingGenerator(NamespacedGenerator):
     XML generator with pretty-printing.
     """
 
-    def __init__(self, *args, **kwargs) -> None:
-        self._text_wrap: bool = kwargs.pop('text_wrap', True)
-        self._indent: str = ' ' * kwargs.pop('indent', 2)
-        self._width: int = kwargs.pop('width', 70)
-        self._min_width: int = kwargs.pop('min_width', 20)
-        super().__init__(*args, **kwargs)
+    __slots__ = ('_text_wrap', '_indent', '_width', '_min_width', '_wrapper_cache', '_indents')
+
+    def __init__(
+            self,
+            file: IO,
+            root: str,
+            attrs: Optional[AttrsType] = None,
+            namespaces: Optional[Dict[str, str]] = None,
+            buffer_size: Optional[int] = None,
+            text_wrap: bool = True,
+            indent: int = 2,
+            width: int = 70,
+            min_width: int = 20,
+    ) -> None:
+        self._text_wrap = text_wrap
+        self._indent = ' ' * indent
+        self._width = width
+        self._min_width = min_width
+        self._wrapper_cache: Dict[Tuple[int, str], 'TextWrapper'] = {}
+        self._indents: List[str] = ['']
+        super().__init__(file, root, attrs, namespaces, buffer_size)
 
     def _format_value(self, value: str) -> str:
-        indent = self._indent * len(self.stack)
-        self.file.write(f'\n{indent}')
+        indent = self._indents[-1]
+        self._write(f'\n{indent}'.encode('utf-8'))
         if len(value) > self._width and self._text_wrap:
             fill = self._fill(value, indent + self._indent)
             value = f'{fill}\n{indent}'
@@ -211,27 +364,44 @@ class IndentingGenerator(NamespacedGenerator):
 
     def _fill(self, value: str, indent: Optional[str] = None) -> str:
         if indent is None:
-            indent = self._indent * len(self.stack)
+            indent = self._indents[-1]
         width = max(self._min_width, self._width - len(indent))
-        tw = textwrap.TextWrapper(width=width, initial_indent=indent, subsequent_indent=indent)
+        key = (width, indent)
+        tw = self._wrapper_cache.get(key)
+        if tw is None:
+            # textwrap is only needed for pretty-printing, so it's imported lazily
+            from textwrap import TextWrapper
+            tw = TextWrapper(width=width, initial_indent=indent, subsequent_indent=indent)
+            self._wrapper_cache[key] = tw
         return f'\n{tw.fill(value)}'
 
-    def __exit__(self, *args, **kwargs) -> None:
-        fill = self._indent * (len(self.stack) - 1)
-        self.file.write(f'\n{fill}')
-        super().__exit__(*args, **kwargs)
+    def __exit__(self, exc_type, exc_value, exc_tb) -> None:
+        self._write(f'\n{self._indents[-2]}'.encode('utf-8'))
+        super().__exit__(exc_type, exc_value, exc_tb)
+        if exc_type:
+            return
+        self._indents.pop()
         if not self.stack:
-            self.file.write('\n')
+            self._write(b'\n')
+            self.flush()
 
-    def container(self, *args, **kwargs) -> XMLGenerator:
-        fill = self._indent * len(self.stack)
-        self.file.write(f'\n{fill}')
-        return super().container(*args, **kwargs)
+    def container(
+            self,
+            name: str,
+            attrs: Optional[AttrsType] = None,
+            namespaces: Optional[Dict[str, str]] = None,
+            **kwargs,
+    ) -> XMLGenerator:
+        indent = self._indents[-1]
+        self._write(f'\n{indent}'.encode('utf-8'))
+        result = super().container(name, attrs, namespaces, **kwargs)
+        self._indents.append(indent + self._indent)
+        return result
 
-    def element(
+    def element(  # type: ignore[override]
             self,
             name: str,
-            attrs: Optional[Dict[str, str]] = None,
+            attrs: Optional[AttrsType] = None,
             namespaces: Optional[Dict[str, str]] = None,
             text: str = '',
     ) -> None:
@@ -251,6 +421,8 @@ class Queue:
     In-memory queue for using as a temporary buffer in xml generator.
     """
 
+    __slots__ = ('data',)
+
     def __init__(self) -> None:
         self.data = bytearray()
 
@@ -260,19 +432,20 @@ class Queue:
     def write(self, value: Union[bytes, bytearray]) -> None:
         self.data.extend(value)
 
-    def pop(self) -> str:
-        result = str(self.data)
-        self.data = bytearray()
+    def pop(self) -> bytes:
+        result = bytes(self.data)
+        self.data.clear()
         return result
 
 
 def xml(
         file: IO,
         root: str,
-        attrs: Optional[Dict[str, str]] = None,
+        attrs: Optional[AttrsType] = None,
         namespaces: Optional[Dict[str, str]] = None,
         indent: Optional[int] = None,
         text_wrap: bool = True,
+        buffer_size: Optional[int] = None,
         **kwargs,
 ) -> XMLGenerator:
     """
@@ -285,10 +458,14 @@ def xml(
     - attrs: attributes dict
     - namespaces: namespaces dict {prefix: uri}, default namespace has prefix ''
     - indent: indent size to pretty-print XML. When None then pretty-print is disabled.
+    - buffer_size: size of output chunks passed to the file, 64KB by default
+      (0 for a Queue)
     """
     if indent is not None:
-        return IndentingGenerator(file, root, attrs, namespaces, text_wrap=text_wrap, indent=indent, **kwargs)
+        return IndentingGenerator(
+            file, root, attrs, namespaces, buffer_size, text_wrap=text_wrap, indent=indent, **kwargs,
+        )
     elif namespaces:
-        return NamespacedGenerator(file, root, attrs, namespaces)
+        return NamespacedGenerator(file, root, attrs, namespaces, buffer_size)
     else:
-        return XMLGenerator(file, root, attrs)
+        return XMLGenerator(file, root, attrs, buffer_size)
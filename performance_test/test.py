@@ -8,7 +8,7 @@ def ef_generator(file: IO, count: int) -> None:
 
     with elementflow.xml(file, 'contacts') as xml:
         for i in range(count):
-            with xml.container('person', {'id': str(i)}):
+            with xml.container('person', {'id': i}):
                 xml.element('name', text='John & Smith')
                 xml.element('email', text='john.smith@megacorp.com')
                 with xml.container('phones'):
@@ -1,5 +1,14 @@
+import os
+
 from setuptools import setup
 
+# Set ELEMENTFLOW_MYPYC=1 to compile the module into a C extension with mypyc.
+# The pure Python module is installed otherwise.
+ext_modules = []
+if os.environ.get('ELEMENTFLOW_MYPYC'):
+    from mypyc.build import mypycify
+    ext_modules = mypycify(['elementflow.py'])
+
 setup(
     name='elementflow',
     version='0.5',
@@ -23,4 +32,5 @@ setup(
         ]
     },
     py_modules=['elementflow'],
+    ext_modules=ext_modules,
 )
@@ -35,6 +35,28 @@ def test_xml():
     )
 
 
+@pytest.mark.parametrize('value, text, attr', [
+    ('plain', 'plain', '"plain"'),
+    ('&', '&amp;', '"&amp;"'),
+    ('a<b & "c"', 'a&lt;b &amp; "c"', '"a&lt;b &amp; &quot;c&quot;"'),
+    ('&&<<', '&amp;&amp;&lt;&lt;', '"&amp;&amp;&lt;&lt;"'),
+])
+def test_escape(value, text, attr):
+    assert elementflow.escape(value) == text
+    assert elementflow.quote_value(value) == attr
+
+
+def test_int_attrs():
+    assert elementflow.convert_attrs_to_string({'id': 1}) == ' id="1"'
+    assert elementflow.convert_attrs_to_string({'id': 1, 'key': '&'}) == ' id="1" key="&amp;"'
+    assert elementflow.convert_attrs_to_string({'a': 1, 'b': 'x'}) == ' a="1" b="x"'
+    for value in (True, 1.0):
+        with pytest.raises(TypeError):
+            elementflow.convert_attrs_to_string({'a': value})
+        with pytest.raises(TypeError):
+            elementflow.convert_attrs_to_string({'a': value, 'b': 'x'})
+
+
 def test_non_well_formed_on_exception():
     buffer = BytesIO()
     try:
@@ -50,6 +72,57 @@ def test_non_well_formed_on_exception():
         ET.parse(buffer)
 
 
+def test_flush():
+    buffer = BytesIO()
+    with elementflow.xml(buffer, 'root') as xml:
+        xml.element('item')
+        assert buffer.getvalue() == b''
+        xml.flush()
+        assert buffer.getvalue() == _bytes('<?xml version="1.0" encoding="utf-8"?><root><item/>')
+        xml.element('item', text='x' * xml.buffer_size)
+        assert len(buffer.getvalue()) > xml.buffer_size
+    assert buffer.getvalue().endswith(b'</item></root>')
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'namespaces': {'n': 'urn:n'}}, {'indent': 2}])
+def test_buffer_size(kwargs):
+    buffer = BytesIO()
+    with elementflow.xml(buffer, 'root', buffer_size=10, **kwargs) as xml:
+        assert xml.buffer_size == 10
+        xml.element('item', text='text')
+        assert b'<item>text</item>' in buffer.getvalue()
+
+
+def test_queue():
+    queue = elementflow.Queue()
+    with elementflow.xml(queue, 'root') as xml:
+        xml.element('item')
+        assert queue.pop() == _bytes('<?xml version="1.0" encoding="utf-8"?><root><item/>')
+        assert len(queue) == 0
+    assert queue.pop() == b'</root>'
+
+
+def test_flush_passes_bytes():
+    chunks = []
+
+    class Sink:
+        def write(self, value):
+            chunks.append(value)
+
+    with elementflow.xml(Sink(), 'root', buffer_size=1) as xml:
+        xml.element('item')
+    assert all(type(chunk) is bytes for chunk in chunks)
+    assert b''.join(chunks) == _bytes('<?xml version="1.0" encoding="utf-8"?><root><item/></root>')
+
+
+def test_queue_buffer_size():
+    queue = elementflow.Queue()
+    with elementflow.xml(queue, 'root', buffer_size=1024) as xml:
+        xml.element('item')
+        assert len(queue) == 0
+    assert queue.pop().endswith(b'<item/></root>')
+
+
 def test_comment():
     buffer = BytesIO()
     with elementflow.xml(buffer, 'root') as xml:
@@ -97,6 +170,27 @@ def test_bad_namespace(args):
         g()
 
 
+def test_element_namespaces_are_local():
+    buffer = BytesIO()
+    attrs = {'key': 'value'}
+    with elementflow.xml(buffer, 'root', namespaces={'n': 'urn:n'}) as xml:
+        xml.element('n1:item', attrs, namespaces={'n1': 'urn:n1'})
+        assert attrs == {'key': 'value'}
+        with pytest.raises(ValueError):
+            xml.element('n1:item')
+
+
+def test_container_namespaces_are_popped():
+    buffer = BytesIO()
+    with elementflow.xml(buffer, 'root', namespaces={'n': 'urn:n'}) as xml:
+        with xml.container('n1:container', namespaces={'n1': 'urn:n1'}):
+            with xml.container('n:inner'):
+                xml.element('n1:item', {'n1:key': 'value'})
+        with pytest.raises(ValueError):
+            xml.element('n1:item')
+        xml.element('n:item')
+
+
 def test_map():
     data = [(1, 'One'), (2, 'Two'), (3, 'Three')]
     buffer = BytesIO()
@@ -121,6 +215,21 @@ def test_map():
     )
 
 
+@pytest.mark.parametrize('kwargs', [{}, {'namespaces': {'n': 'urn:n'}}, {'indent': 2}])
+def test_many(kwargs):
+    buffer = BytesIO()
+    with elementflow.xml(buffer, 'root', **kwargs) as xml:
+        xml.many('item', [({'key': '1'}, 'One & Two'), ({'key': '2'}, ''), (None, 'Three'), (None, '')])
+    buffer.seek(0)
+    items = ET.parse(buffer).getroot()
+    assert [(item.attrib, item.text) for item in items] == [
+        ({'key': '1'}, 'One & Two'),
+        ({'key': '2'}, None),
+        ({}, 'Three'),
+        ({}, None),
+    ]
+
+
 def test_indent():
     buffer = BytesIO()
     with elementflow.xml(buffer, 'root', indent=2) as xml: